@@ -0,0 +1,208 @@
+import math
+import os
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from instrumentation import Counter, Gauge, Histogram, registry
+
+admission_in_flight = registry.register(Gauge(
+    'agritech_admission_in_flight', 'Requests admitted and still running, per cost class', ('cost_class',)
+))
+admission_queued = registry.register(Gauge(
+    'agritech_admission_queued', 'Requests waiting for a concurrency slot, per cost class', ('cost_class',)
+))
+admission_limits = registry.register(Gauge(
+    'agritech_admission_limit', 'Configured admission limits', ('cost_class', 'limit')
+))
+admission_admitted = registry.register(Counter(
+    'agritech_admission_admitted_total', 'Requests admitted, per cost class', ('cost_class',)
+))
+admission_rejected = registry.register(Counter(
+    'agritech_admission_rejected_total', 'Requests rejected by admission control', ('cost_class', 'reason')
+))
+admission_wait = registry.register(Histogram(
+    'agritech_admission_wait_seconds', 'Time spent queued for a concurrency slot', ('cost_class',),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+))
+
+# name -> (max concurrent, max queued, seconds a queued request may wait)
+DEFAULT_COST_CLASSES = {
+    'light': (64, 128, 2.0),
+    'llm': (8, 16, 5.0),
+    'vision': (max(2, os.cpu_count() or 2), 4, 5.0)
+}
+
+
+class Rejected(Exception):
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class CostClass:
+    """Bounded concurrency with a short bounded wait queue"""
+
+    def __init__(self, name, max_concurrent, max_queued, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._queued = 0
+        admission_limits.set(max_concurrent, cost_class=name, limit='concurrency')
+        admission_limits.set(max_queued, cost_class=name, limit='queue')
+
+    def acquire(self):
+        with self._cond:
+            if self._in_flight < self.max_concurrent:
+                self._in_flight += 1
+                admission_in_flight.set(self._in_flight, cost_class=self.name)
+                return
+            if self._queued >= self.max_queued:
+                raise Rejected(503, 'queue_full', self.queue_timeout)
+
+            self._queued += 1
+            admission_queued.set(self._queued, cost_class=self.name)
+            start = time.monotonic()
+            try:
+                admitted = self._cond.wait_for(lambda: self._in_flight < self.max_concurrent, self.queue_timeout)
+            finally:
+                self._queued -= 1
+                admission_queued.set(self._queued, cost_class=self.name)
+            admission_wait.observe(time.monotonic() - start, cost_class=self.name)
+            if not admitted:
+                raise Rejected(503, 'queue_timeout', self.queue_timeout)
+            self._in_flight += 1
+            admission_in_flight.set(self._in_flight, cost_class=self.name)
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            admission_in_flight.set(self._in_flight, cost_class=self.name)
+            self._cond.notify()
+
+
+class RateLimiter:
+    """Per-client token buckets; each request spends its route's cost weight"""
+
+    def __init__(self, rate, burst, idle_ttl=600, sweep_every=1000):
+        self.rate = rate
+        self.burst = burst
+        self.idle_ttl = idle_ttl
+        self.sweep_every = sweep_every
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._calls = 0
+        admission_limits.set(rate, cost_class='*', limit='tokens_per_second')
+        admission_limits.set(burst, cost_class='*', limit='burst')
+
+    def take(self, client, weight):
+        weight = min(weight, self.burst)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < weight:
+                self._buckets[client] = (tokens, now)
+                raise Rejected(429, 'rate_limited', (weight - tokens) / self.rate)
+            self._buckets[client] = (tokens - weight, now)
+
+            self._calls += 1
+            if self._calls % self.sweep_every == 0:
+                self._sweep(now)
+        return weight
+
+    def refund(self, client, weight):
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.burst, time.monotonic()))
+            self._buckets[client] = (min(self.burst, tokens + weight), updated)
+
+    def _sweep(self, now):
+        # Clients idle long enough to have refilled completely need no state
+        stale = [c for c, (_, updated) in self._buckets.items() if now - updated > self.idle_ttl]
+        for client in stale:
+            del self._buckets[client]
+
+
+class AdmissionController:
+    def __init__(self, route_costs, cost_classes=None, rate=20.0, burst=60.0, trust_proxy=False):
+        self.route_costs = route_costs
+        self.classes = {
+            name: CostClass(name, *limits)
+            for name, limits in (cost_classes or DEFAULT_COST_CLASSES).items()
+        }
+        self.limiter = RateLimiter(rate, burst)
+        self.trust_proxy = trust_proxy
+
+    def client_key(self):
+        if self.trust_proxy and request.headers.get('X-Forwarded-For'):
+            return request.headers['X-Forwarded-For'].split(',')[0].strip()
+        return request.remote_addr or 'unknown'
+
+    def cost(self, endpoint, content_length):
+        """Cost class and token weight; uploads get heavier with their size"""
+        cost_class, base, per_mb = self.route_costs.get(endpoint, ('light', 1, 0))
+        return cost_class, base + per_mb * (content_length or 0) / (1024 * 1024)
+
+    def admit(self, endpoint, client, content_length):
+        cost_class, weight = self.cost(endpoint, content_length)
+        try:
+            spent = self.limiter.take(client, weight)
+            try:
+                self.classes[cost_class].acquire()
+            except Rejected:
+                self.limiter.refund(client, spent)
+                raise
+        except Rejected as e:
+            admission_rejected.inc(cost_class=cost_class, reason=e.reason)
+            raise
+        admission_admitted.inc(cost_class=cost_class)
+        return cost_class
+
+    def release(self, cost_class):
+        self.classes[cost_class].release()
+
+
+def init_app(app, route_costs):
+    """Reject or queue requests before the view runs, based on route cost and client"""
+    app.config.setdefault('ADMISSION_ENABLED', True)
+    app.config.setdefault('ADMISSION_COST_CLASSES', DEFAULT_COST_CLASSES)
+    app.config.setdefault('RATE_LIMIT_TOKENS_PER_SECOND', 20.0)
+    app.config.setdefault('RATE_LIMIT_BURST', 60.0)
+    app.config.setdefault('ADMISSION_TRUST_PROXY', False)
+    if not app.config['ADMISSION_ENABLED']:
+        return None
+
+    controller = AdmissionController(
+        route_costs,
+        cost_classes=app.config['ADMISSION_COST_CLASSES'],
+        rate=app.config['RATE_LIMIT_TOKENS_PER_SECOND'],
+        burst=app.config['RATE_LIMIT_BURST'],
+        trust_proxy=app.config['ADMISSION_TRUST_PROXY']
+    )
+    app.extensions['admission'] = controller
+    exempt = {'static', 'metrics'}
+
+    @app.before_request
+    def _admit():
+        if request.endpoint is None or request.endpoint in exempt:
+            return None
+        try:
+            g._admission_class = controller.admit(request.endpoint, controller.client_key(), request.content_length)
+        except Rejected as e:
+            message = 'Too many requests' if e.status == 429 else 'Server busy, please retry'
+            return jsonify({'error': message, 'reason': e.reason}), e.status, {'Retry-After': str(e.retry_after)}
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        cost_class = g.pop('_admission_class', None)
+        if cost_class is not None:
+            controller.release(cost_class)
+
+    return controller
@@ -0,0 +1,226 @@
+import math
+import threading
+from datetime import datetime, timedelta
+
+# Event name -> per-day counter it increments
+EVENT_COUNTERS = {
+    'prediction': 'predictions_made',
+    'recommendation': 'recommendations_made',
+    'health_analysis': 'health_analyses',
+    'crop_record': 'crop_records',
+    'sensor_reading': 'sensor_readings'
+}
+
+MAX_LABEL_LENGTH = 64
+# Bucket for crops/states seen after max_labels distinct values are tracked
+OTHER_LABEL = 'Other'
+# Events that count towards a crop's trending aggregate
+CROP_EVENTS = {'prediction', 'crop_record'}
+
+
+def _label(value):
+    # Labels come straight from request bodies and become dict/set keys
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    label = str(value).strip()[:MAX_LABEL_LENGTH]
+    return label or None
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _new_day():
+    day = {name: 0 for name in EVENT_COUNTERS.values()}
+    day['yield_sum'] = 0.0
+    day['yield_count'] = 0
+    return day
+
+
+class _TopN:
+    """The n labels with the largest aggregates, kept current on every update.
+
+    Aggregates only ever grow, so a label outside the top n can only enter
+    by overtaking the current last entry.
+    """
+
+    def __init__(self, n, sort_key):
+        self.n = n
+        self.sort_key = sort_key
+        self.labels = []
+
+    def touch(self, label, aggregates):
+        # The overflow bucket is a catch-all, not a crop or state to rank
+        if label == OTHER_LABEL:
+            return
+        labels = self.labels
+        if label not in labels:
+            if len(labels) < self.n:
+                labels.append(label)
+            elif self.sort_key(aggregates[label]) > self.sort_key(aggregates[labels[-1]]):
+                labels[-1] = label
+            else:
+                return
+        labels.sort(key=lambda l: self.sort_key(aggregates[l]), reverse=True)
+
+
+class AnalyticsStore:
+    """In-memory event counters with incrementally materialized aggregates.
+
+    Every event updates its day bucket, its crop/state aggregates and the
+    running top-n rankings in O(1). Only predictions and crop records create
+    crop aggregates. Crops and states beyond max_labels share an "Other"
+    aggregate, which is never ranked, and at most max_farms farm ids are
+    kept for the active farm count, so memory stays bounded whatever clients send. The
+    dashboard payload is rebuilt outside the lock, from a fixed-size copy
+    taken under it, only when new events have arrived.
+    """
+
+    def __init__(self, retention_days=30, top_n=5, max_labels=200, max_farms=100000):
+        self.retention_days = retention_days
+        self.top_n = top_n
+        self.max_labels = max_labels
+        self.max_farms = max_farms
+        self._lock = threading.Lock()
+        self._days = {}
+        self._crops = {}
+        self._states = {}
+        self._trending = _TopN(top_n, lambda agg: (agg[0], agg[1]))
+        self._regional = _TopN(top_n, lambda agg: agg[0])
+        self._farms = set()
+        self._totals = _new_day()
+        self._totals.update({'area_hectares': 0.0, 'health_sum': 0.0})
+        self._version = 0
+        self._snapshot = None
+        self._snapshot_version = -1
+        self._snapshot_day = None
+
+    def _aggregate(self, aggregates, label, empty):
+        agg = aggregates.get(label)
+        if agg is None:
+            if len(aggregates) >= self.max_labels:
+                label = OTHER_LABEL
+                agg = aggregates.get(label)
+            if agg is None:
+                agg = aggregates[label] = list(empty)
+        return label, agg
+
+    def record(self, event, crop=None, state=None, yield_value=None,
+               health_score=None, farm_id=None, area=None, when=None):
+        counter = EVENT_COUNTERS.get(event)
+        if counter is None:
+            raise ValueError(f"Unknown analytics event: {event}")
+        day_key = (when or datetime.now()).strftime('%Y-%m-%d')
+        crop, state, farm_id = _label(crop), _label(state), _label(farm_id)
+        yield_value, health_score, area = _number(yield_value), _number(health_score), _number(area)
+
+        with self._lock:
+            day = self._days.get(day_key)
+            if day is None:
+                day = self._days[day_key] = _new_day()
+                self._prune_days(day_key)
+            day[counter] += 1
+            self._totals[counter] += 1
+
+            if yield_value is not None:
+                day['yield_sum'] += yield_value
+                day['yield_count'] += 1
+                self._totals['yield_sum'] += yield_value
+                self._totals['yield_count'] += 1
+            if health_score is not None:
+                self._totals['health_sum'] += health_score
+            if farm_id is not None and len(self._farms) < self.max_farms:
+                self._farms.add(farm_id)
+            if area is not None:
+                self._totals['area_hectares'] += area
+
+            if crop is not None and event in CROP_EVENTS:
+                crop, agg = self._aggregate(self._crops, crop, (0, 0, 0.0, 0))
+                agg[0] += event == 'prediction'
+                agg[1] += event == 'crop_record'
+                if yield_value is not None:
+                    agg[2] += yield_value
+                    agg[3] += 1
+                self._trending.touch(crop, self._crops)
+            if state is not None:
+                state, agg = self._aggregate(self._states, state, (0, 0.0, 0))
+                agg[0] += 1
+                if yield_value is not None:
+                    agg[1] += yield_value
+                    agg[2] += 1
+                self._regional.touch(state, self._states)
+
+            self._version += 1
+
+    def _prune_days(self, newest_key):
+        cutoff = (datetime.strptime(newest_key, '%Y-%m-%d')
+                  - timedelta(days=self.retention_days - 1)).strftime('%Y-%m-%d')
+        for key in [k for k in self._days if k < cutoff]:
+            del self._days[key]
+
+    def dashboard(self):
+        today = datetime.now()
+        keys = [(today - timedelta(days=i)).strftime('%Y-%m-%d')
+                for i in range(self.retention_days - 1, -1, -1)]
+        with self._lock:
+            # The 30-day window also shifts at midnight, even without new events
+            if self._snapshot_version == self._version and self._snapshot_day == today.date():
+                return self._snapshot
+            version = self._version
+            days = [(key, dict(self._days[key]) if key in self._days else None) for key in keys]
+            totals = dict(self._totals)
+            active_farms = len(self._farms)
+            trending = [(c, tuple(self._crops[c])) for c in self._trending.labels]
+            regional = [(s, tuple(self._states[s])) for s in self._regional.labels]
+
+        snapshot = self._build_snapshot(days, totals, active_farms, trending, regional)
+        with self._lock:
+            if version >= self._snapshot_version:
+                self._snapshot = snapshot
+                self._snapshot_version = version
+                self._snapshot_day = today.date()
+        return snapshot
+
+    @staticmethod
+    def _build_snapshot(days, totals, active_farms, trending, regional):
+        historical_data = []
+        for key, day in days:
+            day = day or _new_day()
+            entry = {'date': key}
+            entry.update({name: day[name] for name in EVENT_COUNTERS.values()})
+            entry['avg_yield'] = round(day['yield_sum'] / day['yield_count'], 2) if day['yield_count'] else 0
+            historical_data.append(entry)
+
+        stats = {
+            'total_predictions': totals['predictions_made'],
+            'total_recommendations': totals['recommendations_made'],
+            'total_health_analyses': totals['health_analyses'],
+            'total_crop_records': totals['crop_records'],
+            'total_sensor_readings': totals['sensor_readings'],
+            'active_farms': active_farms,
+            'avg_yield': round(totals['yield_sum'] / totals['yield_count'], 2) if totals['yield_count'] else 0,
+            'avg_health_score': round(totals['health_sum'] / totals['health_analyses'], 1) if totals['health_analyses'] else 0,
+            'total_area_monitored': round(totals['area_hectares'], 2)
+        }
+
+        trending_crops = [
+            {'crop': crop, 'predictions': agg[0], 'records': agg[1],
+             'avg_yield': round(agg[2] / agg[3], 2) if agg[3] else 0}
+            for crop, agg in trending
+        ]
+        regional_performance = [
+            {'state': state, 'requests': agg[0],
+             'yield_index': round(agg[1] / agg[2], 2) if agg[2] else 0}
+            for state, agg in regional
+        ]
+
+        return {
+            'historical_data': historical_data,
+            'current_stats': stats,
+            'trending_crops': trending_crops,
+            'regional_performance': regional_performance
+        }
@@ -1,10 +1,7 @@
-from flask import Flask, request, jsonify, render_template
-from flask_socketio import SocketIO, emit
-import joblib
+from flask import Blueprint, Flask, current_app, request, jsonify, render_template, send_file, url_for
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import numpy as np
-import google.generativeai as genai
 import re
-import cv2
 import hashlib
 import json
 import random
@@ -12,32 +9,55 @@ import threading
 import time
 import base64
 import io
-from PIL import Image
+import atexit
+import importlib.util
+from types import SimpleNamespace
+from bisect import bisect_right
 from datetime import datetime, timedelta
 import os
 from werkzeug.utils import secure_filename
+from analytics import AnalyticsStore
+from gamification import GamificationStore
+import instrumentation
+from instrumentation import span
+import wire
+import admission
+import farm_import
+from recommendation_cache import RecommendationCache
 
-app = Flask(__name__, template_folder="templates", static_folder="static")
-app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Heavy dependencies (cv2, PIL, joblib/sklearn, google.generativeai) are imported
+# by the features that use them, and nothing starts running until create_app()
+# and start_background_tasks() are called.
+bp = Blueprint('main', __name__)
 
-# Initialize SocketIO for real-time features
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Initialize SocketIO for real-time features (bound to the app in create_app)
+socketio = SocketIO()
 
-# Create uploads directory if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-# Load models
+# Models are loaded on first use or by warm_up()
 crop_model = None
 yield_model = None
 scaler = None
 label_encoders = {}
+models_loaded = False
+model_version = None
+_models_checked_at = 0.0
+_models_lock = threading.Lock()
+MODEL_FILES = ('crop_recommendation_model.pkl', 'yield_prediction_model.pkl',
+               'feature_scaler.pkl', 'label_encoders.pkl')
+MODEL_CHECK_INTERVAL = 30.0  # seconds between model file signature checks
+
+gemini = None
+_gemini_lock = threading.Lock()
+
+_background_lock = threading.Lock()
+_background_started = False
 
 # Global storage for features
 blockchain_ledger = []
-user_points = {'default_user': 250}  # Start with some points
 sensor_data_history = []
+analytics_store = AnalyticsStore(retention_days=30)
+import_jobs = farm_import.JobRegistry(max_jobs=100)
+recommendation_cache = RecommendationCache(max_entries=4096)
 
 numerical_features = [
     'year', 'area', 'N', 'P', 'K', 'pH',
@@ -56,42 +76,100 @@ achievements = {
     'iot_master': {'points': 35, 'title': 'IoT Master', 'description': 'Monitored real-time sensor data', 'icon': 'fas fa-satellite'}
 }
 
+# Badges unlocked by point thresholds, in ascending order
+badge_tiers = [
+    (10, {"name": "First Steps", "icon": "fas fa-seedling", "color": "success"}),
+    (50, {"name": "Tech Adopter", "icon": "fas fa-microchip", "color": "info"}),
+    (100, {"name": "Data Driven", "icon": "fas fa-chart-bar", "color": "primary"}),
+    (200, {"name": "Climate Champion", "icon": "fas fa-globe", "color": "warning"}),
+    (300, {"name": "Innovation Master", "icon": "fas fa-trophy", "color": "danger"})
+]
+badge_thresholds = [threshold for threshold, _ in badge_tiers]
+
+# Admission control: endpoint -> (cost class, token weight, extra weight per MB uploaded)
+route_costs = {
+    'main.crop_health_analysis': ('vision', 5, 2),
+    'main.predict_yield': ('llm', 4, 0),
+    'main.recommend_crop': ('llm', 4, 0),
+    'main.smart_advice': ('llm', 4, 0),
+    'main.climate_risk_assessment': ('llm', 4, 0),
+    'main.import_farm_data': ('light', 10, 1)
+}
+
+# Start the demo user with some points and the achievements they imply
+seed_users = {'default_user': (250, ['first_prediction', 'climate_warrior', 'data_master', 'consistent_user'])}
+
+def model_file_signature(*paths):
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{path}:missing")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
 def safe_load():
-    global crop_model, yield_model, scaler, label_encoders
-    try:
-        crop_model = joblib.load('crop_recommendation_model.pkl')
-    except:
-        crop_model = None
-        print("Warning: crop_recommendation_model.pkl not found")
-    try:
-        yield_model = joblib.load('yield_prediction_model.pkl')
-    except:
-        yield_model = None
-        print("Warning: yield_prediction_model.pkl not found")
-    try:
-        scaler = joblib.load('feature_scaler.pkl')
-    except:
-        scaler = None
-        print("Warning: feature_scaler.pkl not found")
-    try:
-        label_encoders.update(joblib.load('label_encoders.pkl'))
-    except:
-        print("Warning: label_encoders.pkl not found")
+    """Load every model file and swap the new set in together"""
+    global crop_model, yield_model, scaler, label_encoders, model_version
+    import joblib
+    version = model_file_signature(*MODEL_FILES)
+    loaded = {}
+    for path in MODEL_FILES:
+        try:
+            loaded[path] = joblib.load(path)
+        except:
+            loaded[path] = None
+            print(f"Warning: {path} not found")
+    # A fresh encoders dict, so requests still using the old one never see it half-filled
+    crop_model, yield_model, scaler, label_encoders, model_version = (
+        loaded['crop_recommendation_model.pkl'], loaded['yield_prediction_model.pkl'],
+        loaded['feature_scaler.pkl'], dict(loaded['label_encoders.pkl'] or {}), version
+    )
+
+def ensure_models():
+    """Load the models on first use, and reload them when the files change.
+
+    The file signature is re-checked at most every MODEL_CHECK_INTERVAL
+    seconds, so a retrained model deployed in place is picked up (and the
+    recommendation cache invalidated) without a restart.
+    """
+    global models_loaded, _models_checked_at
+    if models_loaded and time.monotonic() - _models_checked_at < MODEL_CHECK_INTERVAL:
+        return
+    with _models_lock:
+        if models_loaded and time.monotonic() - _models_checked_at < MODEL_CHECK_INTERVAL:
+            return
+        _models_checked_at = time.monotonic()
+        if not models_loaded or model_file_signature(*MODEL_FILES) != model_version:
+            safe_load()
+            models_loaded = True
 
-safe_load()
+def crop_model_version():
+    # File signature from the last load, plus object identity so that models
+    # swapped in at runtime also count as a new version
+    return (model_version, id(crop_model), id(scaler), id(label_encoders.get('crop')))
 
 def encode_label(col, value):
     if col in label_encoders:
         le = label_encoders[col]
         try:
-            return int(le.transform([str(value)])[0])
+            with span('encode_label'):
+                return int(le.transform([str(value)])[0])
         except:
             return -1
     return -1
 
-# Configure Gemini API
-genai.configure(api_key="hahaha")
-gemini = genai.GenerativeModel("gemini-1.5-flash")
+def get_gemini():
+    """Configure the Gemini client on first use"""
+    global gemini
+    if gemini is None:
+        with _gemini_lock:
+            if gemini is None:
+                import google.generativeai as genai
+                genai.configure(api_key="hahaha")
+                gemini = genai.GenerativeModel("gemini-1.5-flash")
+    return gemini
 
 def format_bullets(text):
     """Convert markdown bullets to clean plain text bullets"""
@@ -100,6 +178,13 @@ def format_bullets(text):
     text = re.sub(r'\n{2,}', '\n', text)
     return text.strip()
 
+def ask_gemini(prompt):
+    """Query Gemini and return its answer as plain text bullets"""
+    with span('gemini.generate_content'):
+        response = get_gemini().generate_content(prompt)
+    with span('format_bullets'):
+        return format_bullets(response.text)
+
 # IoT Sensor Simulation
 def generate_sensor_data():
     while True:
@@ -131,21 +216,56 @@ def generate_sensor_data():
         sensor_data_history.append(data)
         if len(sensor_data_history) > 100:
             sensor_data_history.pop(0)
+        analytics_store.record('sensor_reading', when=current_time)
         
-        # Emit to connected clients
-        socketio.emit('sensor_update', data)
-        time.sleep(10)  # Update every 10 seconds
+        # Emit to connected clients, in the wire format each one asked for
+        with span('sensor.emit'):
+            socketio.emit('sensor_update', data, to='sensor_json')
+            socketio.emit('sensor_update_compact',
+                          wire.encode_row(data, wire.SENSOR_COLUMNS, wire.SENSOR_PRECISION),
+                          to='sensor_compact')
+        socketio.sleep(10)  # Update every 10 seconds
+
+def flush_gamification(store):
+    # Batches otherwise only flush on the next award, so a quiet period would
+    # leave the last points in memory until shutdown
+    while True:
+        socketio.sleep(store.flush_interval)
+        store.flush()
+
+def start_background_tasks(app):
+    """Start the sensor simulation and the app's gamification flusher.
+
+    Only called by a real server (__main__, or create_app with
+    BACKGROUND_TASKS set), never by requests, so test clients and the
+    benchmarks run without them. The sensor simulation feeds the shared
+    socketio object and runs once per process; each app gets its own
+    flusher for its own store.
+    """
+    global _background_started
+    with _background_lock:
+        if not _background_started:
+            socketio.start_background_task(generate_sensor_data)
+            _background_started = True
+        if not app.extensions.get('background_flusher'):
+            socketio.start_background_task(flush_gamification, app.extensions['gamification'])
+            app.extensions['background_flusher'] = True
 
-# Start sensor simulation in background thread
-threading.Thread(target=generate_sensor_data, daemon=True).start()
+def warm_up():
+    """Load models and heavy libraries ahead of the first request"""
+    ensure_models()
+    get_gemini()
+    import cv2  # noqa: F401
+    from PIL import Image  # noqa: F401
 
 # Routes
-@app.route('/')
+@bp.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/predict_yield', methods=['POST'])
+@bp.route('/predict_yield', methods=['POST'])
 def predict_yield():
+    ensure_models()
     data = request.json or {}
     row = [float(data.get(f, 0)) for f in numerical_features]
     row.append(encode_label("crop", data.get("crop", "")))
@@ -157,13 +277,15 @@ def predict_yield():
         pred = random.uniform(2.5, 8.5)
     else:
         try:
-            pred = yield_model.predict(np.array([row]))[0]
+            with span('yield_model.predict'):
+                pred = yield_model.predict(np.array([row]))[0]
         except:
             pred = random.uniform(2.5, 8.5)
     
     crop_name = data.get("crop", "Unknown Crop")
     state = data.get("state", "Unknown State")
     season = data.get("season", "Unknown Season")
+    analytics_store.record('prediction', crop=data.get("crop"), state=data.get("state"), yield_value=float(pred))
 
     # Smart advice prompt
     query = (
@@ -174,8 +296,7 @@ def predict_yield():
     )
     
     try:
-        response = gemini.generate_content(query)
-        advice = format_bullets(response.text)
+        advice = ask_gemini(query)
     except:
         advice = "• Maintain optimal soil pH between 6.0-7.0\n• Apply balanced NPK fertilizer based on soil test\n• Monitor soil moisture and irrigate when needed\n• Implement integrated pest management practices\n• Ensure proper drainage to prevent waterlogging"
 
@@ -186,13 +307,32 @@ def predict_yield():
         "yield_category": "High" if pred > 6 else "Medium" if pred > 4 else "Low"
     })
 
-@app.route('/recommend_crop', methods=['POST'])
+@bp.route('/recommend_crop', methods=['POST'])
 def recommend_crop():
+    ensure_models()
     data = request.json or {}
+
+    # Nearby soil/climate readings share an entry, so warm requests skip both
+    # the model and Gemini
+    cache_key = None
+    if crop_model is not None and scaler is not None:
+        version = crop_model_version()
+        cache_key = recommendation_cache.key(data, numerical_features)
+        cached = recommendation_cache.get(cache_key, version) if cache_key is not None else None
+        if cached is not None:
+            results, advice = cached
+            analytics_store.record('recommendation', crop=results[0][0], state=data.get("state"))
+            return jsonify({
+                "recommendations": results,
+                "smart_advice": advice,
+                "cached": True
+            })
+
     row = [float(data.get(f, 0)) for f in numerical_features]
     row.append(encode_label("season", data.get("season", "")))
     row.append(encode_label("state", data.get("state", "")))
 
+    from_model = False
     if crop_model is None or scaler is None:
         # Simulate recommendations if models not available
         crops = ['Rice', 'Wheat', 'Cotton', 'Sugarcane', 'Maize']
@@ -200,8 +340,9 @@ def recommend_crop():
         results.sort(key=lambda x: x[1], reverse=True)
     else:
         try:
-            Xs = scaler.transform(np.array([row]))
-            probs = crop_model.predict_proba(Xs)[0]
+            with span('crop_model.predict_proba'):
+                Xs = scaler.transform(np.array([row]))
+                probs = crop_model.predict_proba(Xs)[0]
             top_idx = np.argsort(probs)[-3:][::-1]
             results = []
             if 'crop' in label_encoders:
@@ -209,11 +350,14 @@ def recommend_crop():
                 for idx in top_idx:
                     crop_name = le.inverse_transform([idx])[0]
                     results.append((crop_name, float(probs[idx])))
+            from_model = True
         except:
             crops = ['Rice', 'Wheat', 'Cotton', 'Sugarcane', 'Maize']
             results = [(crop, random.uniform(0.6, 0.95)) for crop in random.sample(crops, 3)]
             results.sort(key=lambda x: x[1], reverse=True)
 
+    analytics_store.record('recommendation', crop=results[0][0] if results else None, state=data.get("state"))
+
     crop_list = ", ".join([c for c, _ in results])
     query = (
         f"Given the soil and climate conditions, the recommended crops are {crop_list}. "
@@ -222,37 +366,40 @@ def recommend_crop():
     )
     
     try:
-        response = gemini.generate_content(query)
-        advice = format_bullets(response.text)
+        advice = ask_gemini(query)
     except:
         advice = "• Consider local market demand and pricing\n• Evaluate water availability for irrigation\n• Check soil suitability for each crop\n• Assess labor requirements and availability\n• Review crop insurance options"
+    else:
+        # Only real model output with real advice is worth replaying
+        if from_model and results and cache_key is not None:
+            recommendation_cache.put(cache_key, version, (results, advice))
 
     return jsonify({
         "recommendations": results,
-        "smart_advice": advice
+        "smart_advice": advice,
+        "cached": False
     })
 
-@app.route('/smart_advice', methods=['POST'])
+@bp.route('/smart_advice', methods=['POST'])
 def smart_advice():
     data = request.json or {}
     prompt = data.get("prompt", "")
 
     try:
-        response = gemini.generate_content(
+        advice = ask_gemini(
             f"You are an agricultural expert. Based on the given soil, weather, and crop conditions, "
             "provide concise, practical advice for the farmer. "
             "Focus on fertilizers, irrigation, pest management, and yield improvement. "
             "Use short bullet points (3–5 tips). "
             f"Farmer's query: {prompt}"
         )
-        advice = format_bullets(response.text)
     except Exception as e:
         advice = "• Maintain proper soil moisture levels\n• Apply fertilizers based on soil test results\n• Monitor crops regularly for pest and disease signs\n• Implement crop rotation practices\n• Ensure adequate drainage systems"
 
     return jsonify({"advice": advice})
 
 # Climate Risk Assessment
-@app.route('/climate-risk-assessment', methods=['POST'])
+@bp.route('/climate-risk-assessment', methods=['POST'])
 def climate_risk_assessment():
     data = request.json or {}
     location = data.get('location', 'Unknown')
@@ -303,8 +450,7 @@ def climate_risk_assessment():
     )
     
     try:
-        response = gemini.generate_content(prompt)
-        ai_recommendations = format_bullets(response.text)
+        ai_recommendations = ask_gemini(prompt)
     except:
         ai_recommendations = "AI recommendations temporarily unavailable"
     
@@ -320,7 +466,7 @@ def climate_risk_assessment():
     })
 
 # Computer Vision Crop Health Analysis
-@app.route('/crop-health-analysis', methods=['POST'])
+@bp.route('/crop-health-analysis', methods=['POST'])
 def crop_health_analysis():
     if 'image' not in request.files:
         return jsonify({'error': 'No image uploaded'}), 400
@@ -329,21 +475,26 @@ def crop_health_analysis():
     if file.filename == '':
         return jsonify({'error': 'No image selected'}), 400
     
+    import cv2
+    from PIL import Image
+
     try:
         # Read and process image
-        image = Image.open(file.stream)
-        img_array = np.array(image)
-        
-        # Convert to OpenCV format
-        if len(img_array.shape) == 3 and img_array.shape[2] == 4:
-            img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
-        elif len(img_array.shape) == 3:
-            img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        else:
-            img_cv = img_array
+        with span('cv.decode'):
+            image = Image.open(file.stream)
+            img_array = np.array(image)
+            
+            # Convert to OpenCV format
+            if len(img_array.shape) == 3 and img_array.shape[2] == 4:
+                img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
+            elif len(img_array.shape) == 3:
+                img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+            else:
+                img_cv = img_array
         
         # Analyze crop health
         health_metrics = analyze_crop_health(img_cv)
+        analytics_store.record('health_analysis', health_score=health_metrics['overall_health'])
         
         return jsonify({
             'health_score': health_metrics['overall_health'],
@@ -361,44 +512,50 @@ def crop_health_analysis():
         return jsonify({'error': f'Image processing failed: {str(e)}'}), 500
 
 def analyze_crop_health(image):
+    import cv2
+
     try:
         # Resize image for processing
-        height, width = image.shape[:2]
-        if width > 800:
-            new_width = 800
-            new_height = int(height * (new_width / width))
-            image = cv2.resize(image, (new_width, new_height))
+        with span('cv.resize'):
+            height, width = image.shape[:2]
+            if width > 800:
+                new_width = 800
+                new_height = int(height * (new_width / width))
+                image = cv2.resize(image, (new_width, new_height))
         
         # Convert to HSV for color analysis
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        with span('cv.hsv'):
+            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
         
         # Define color ranges for different plant health indicators
-        # Healthy green
-        green_lower = np.array([35, 40, 40])
-        green_upper = np.array([85, 255, 255])
-        green_mask = cv2.inRange(hsv, green_lower, green_upper)
-        
-        # Yellowing (nutrient deficiency/disease)
-        yellow_lower = np.array([15, 50, 50])
-        yellow_upper = np.array([35, 255, 255])
-        yellow_mask = cv2.inRange(hsv, yellow_lower, yellow_upper)
-        
-        # Brown (disease/damage)
-        brown_lower = np.array([5, 50, 20])
-        brown_upper = np.array([15, 255, 200])
-        brown_mask = cv2.inRange(hsv, brown_lower, brown_upper)
-        
-        # Dark spots (disease)
-        dark_lower = np.array([0, 0, 0])
-        dark_upper = np.array([180, 255, 50])
-        dark_mask = cv2.inRange(hsv, dark_lower, dark_upper)
+        with span('cv.masks'):
+            # Healthy green
+            green_lower = np.array([35, 40, 40])
+            green_upper = np.array([85, 255, 255])
+            green_mask = cv2.inRange(hsv, green_lower, green_upper)
+            
+            # Yellowing (nutrient deficiency/disease)
+            yellow_lower = np.array([15, 50, 50])
+            yellow_upper = np.array([35, 255, 255])
+            yellow_mask = cv2.inRange(hsv, yellow_lower, yellow_upper)
+            
+            # Brown (disease/damage)
+            brown_lower = np.array([5, 50, 20])
+            brown_upper = np.array([15, 255, 200])
+            brown_mask = cv2.inRange(hsv, brown_lower, brown_upper)
+            
+            # Dark spots (disease)
+            dark_lower = np.array([0, 0, 0])
+            dark_upper = np.array([180, 255, 50])
+            dark_mask = cv2.inRange(hsv, dark_lower, dark_upper)
         
         # Calculate percentages
-        total_pixels = image.shape[0] * image.shape[1]
-        green_percentage = (np.sum(green_mask > 0) / total_pixels) * 100
-        yellow_percentage = (np.sum(yellow_mask > 0) / total_pixels) * 100
-        brown_percentage = (np.sum(brown_mask > 0) / total_pixels) * 100
-        dark_percentage = (np.sum(dark_mask > 0) / total_pixels) * 100
+        with span('cv.pixel_stats'):
+            total_pixels = image.shape[0] * image.shape[1]
+            green_percentage = (np.sum(green_mask > 0) / total_pixels) * 100
+            yellow_percentage = (np.sum(yellow_mask > 0) / total_pixels) * 100
+            brown_percentage = (np.sum(brown_mask > 0) / total_pixels) * 100
+            dark_percentage = (np.sum(dark_mask > 0) / total_pixels) * 100
         
         # Calculate overall health score
         health_score = max(0, min(100, 
@@ -499,7 +656,7 @@ def analyze_crop_health(image):
         }
 
 # Blockchain Traceability
-@app.route('/api/create-crop-record', methods=['POST'])
+@bp.route('/api/create-crop-record', methods=['POST'])
 def create_crop_record():
     data = request.json or {}
     
@@ -530,9 +687,13 @@ def create_crop_record():
     }
     
     # Generate hash
-    record_string = json.dumps(record, sort_keys=True, default=str)
-    record['hash'] = hashlib.sha256(record_string.encode()).hexdigest()
+    with span('ledger.hash'):
+        record_string = json.dumps(record, sort_keys=True, default=str)
+        record['hash'] = hashlib.sha256(record_string.encode()).hexdigest()
     
+    # Recorded first so a bad payload can't leave a ledger entry without its analytics
+    analytics_store.record('crop_record', crop=record['crop_type'], farm_id=record['farmer_id'],
+                           area=record['area_hectares'])
     blockchain_ledger.append(record)
     
     # Generate QR code data
@@ -547,7 +708,7 @@ def create_crop_record():
         'record': record
     })
 
-@app.route('/api/trace-crop/<int:record_id>')
+@bp.route('/api/trace-crop/<int:record_id>')
 def trace_crop(record_id):
     record = next((r for r in blockchain_ledger if r['id'] == record_id), None)
     if not record:
@@ -641,22 +802,14 @@ def trace_crop(record_id):
     })
 
 # Gamification System
-@app.route('/api/user-progress')
+@bp.route('/api/user-progress')
 def user_progress():
     user_id = request.args.get('user', 'default_user')
-    points = user_points.get(user_id, 0)
+    gamification_store = current_app.extensions['gamification']
+    points, earned = gamification_store.get_progress(user_id)
     level = min(points // 100 + 1, 10)  # Max level 10
     
-    # Calculate achievements earned
-    earned_achievements = []
-    if points >= 10:
-        earned_achievements.append(achievements['first_prediction'])
-    if points >= 35:
-        earned_achievements.append(achievements['climate_warrior'])
-    if points >= 85:
-        earned_achievements.append(achievements['data_master'])
-    if points >= 185:
-        earned_achievements.append(achievements['consistent_user'])
+    earned_achievements = [a for key, a in achievements.items() if key in earned]
     
     return jsonify({
         'points': points,
@@ -666,38 +819,38 @@ def user_progress():
         'total_achievements': len(achievements),
         'progress_percentage': min((points % 100), 100),
         'level_title': get_level_title(level),
-        'badges': get_user_badges(points)
+        'badges': get_user_badges(points),
+        'rank': gamification_store.rank(user_id)
     })
 
-@app.route('/api/award-points', methods=['POST'])
+@bp.route('/api/award-points', methods=['POST'])
 def award_points():
     data = request.json or {}
     user_id = data.get('user', 'default_user')
     action = data.get('action', '')
     
     if action in achievements:
-        if user_id not in user_points:
-            user_points[user_id] = 0
-        
-        # Check if achievement already earned
-        old_points = user_points[user_id]
-        if (action == 'first_prediction' and old_points >= 10) or \
-           (action == 'climate_warrior' and old_points >= 35) or \
-           (action == 'data_master' and old_points >= 85):
+        awarded = current_app.extensions['gamification'].award(user_id, action, achievements[action]['points'])
+        if awarded is None:
             return jsonify({'success': False, 'message': 'Achievement already earned'})
         
-        user_points[user_id] += achievements[action]['points']
-        
+        old_points, new_points = awarded
         return jsonify({
             'success': True,
             'points_awarded': achievements[action]['points'],
-            'total_points': user_points[user_id],
+            'total_points': new_points,
             'achievement': achievements[action],
-            'level_up': (user_points[user_id] // 100) > (old_points // 100)
+            'level_up': (new_points // 100) > (old_points // 100)
         })
     
     return jsonify({'success': False, 'message': 'Invalid action'})
 
+@bp.route('/api/leaderboard')
+def leaderboard():
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    return jsonify({'leaderboard': current_app.extensions['gamification'].leaderboard(limit, offset)})
+
 def get_level_title(level):
     titles = {
         1: "Novice Farmer", 2: "Growing Farmer", 3: "Skilled Farmer", 
@@ -708,70 +861,19 @@ def get_level_title(level):
     return titles.get(level, "Farming Enthusiast")
 
 def get_user_badges(points):
-    badges = []
-    if points >= 10:
-        badges.append({"name": "First Steps", "icon": "fas fa-seedling", "color": "success"})
-    if points >= 50:
-        badges.append({"name": "Tech Adopter", "icon": "fas fa-microchip", "color": "info"})
-    if points >= 100:
-        badges.append({"name": "Data Driven", "icon": "fas fa-chart-bar", "color": "primary"})
-    if points >= 200:
-        badges.append({"name": "Climate Champion", "icon": "fas fa-globe", "color": "warning"})
-    if points >= 300:
-        badges.append({"name": "Innovation Master", "icon": "fas fa-trophy", "color": "danger"})
-    return badges
+    return [badge for _, badge in badge_tiers[:bisect_right(badge_thresholds, points)]]
 
 # Analytics and Reporting
-@app.route('/api/analytics-dashboard')
+@bp.route('/api/analytics-dashboard')
 def analytics_dashboard():
-    # Generate analytics data
-    current_date = datetime.now()
-    
-    # Simulate historical data
-    historical_data = []
-    for i in range(30):
-        date = current_date - timedelta(days=i)
-        historical_data.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'predictions_made': random.randint(5, 25),
-            'avg_yield': random.uniform(3.5, 7.2),
-            'user_engagement': random.uniform(65, 95),
-            'sensor_readings': random.randint(100, 500)
-        })
-    
-    historical_data.reverse()
-    
-    # Current statistics
-    stats = {
-        'total_predictions': sum([d['predictions_made'] for d in historical_data]),
-        'active_farms': random.randint(45, 75),
-        'avg_yield_improvement': random.uniform(12, 28),
-        'carbon_saved': random.uniform(150, 350),  # kg CO2
-        'water_saved': random.uniform(1200, 2800),  # liters
-        'total_area_monitored': random.uniform(125, 245)  # hectares
-    }
-    
-    return jsonify({
-        'historical_data': historical_data,
-        'current_stats': stats,
-        'trending_crops': [
-            {'crop': 'Rice', 'predictions': 156, 'avg_yield': 6.2},
-            {'crop': 'Wheat', 'predictions': 134, 'avg_yield': 4.8},
-            {'crop': 'Cotton', 'predictions': 89, 'avg_yield': 3.4},
-            {'crop': 'Maize', 'predictions': 76, 'avg_yield': 5.1},
-            {'crop': 'Sugarcane', 'predictions': 45, 'avg_yield': 7.8}
-        ],
-        'regional_performance': [
-            {'state': 'Tamil Nadu', 'yield_index': 8.2, 'adoption_rate': 78},
-            {'state': 'Punjab', 'yield_index': 7.9, 'adoption_rate': 82},
-            {'state': 'Karnataka', 'yield_index': 7.5, 'adoption_rate': 65},
-            {'state': 'Maharashtra', 'yield_index': 7.1, 'adoption_rate': 71},
-            {'state': 'Andhra Pradesh', 'yield_index': 6.8, 'adoption_rate': 59}
-        ]
-    })
+    # Aggregates are maintained as events arrive, so this is a constant-time read
+    dashboard = analytics_store.dashboard()
+    if wire.wants_columnar():
+        dashboard = dict(dashboard, historical_data=wire.to_columnar(dashboard['historical_data'], {'avg_yield': 2}))
+    return jsonify(dashboard)
 
 # Weather Integration
-@app.route('/api/weather-forecast')
+@bp.route('/api/weather-forecast')
 def weather_forecast():
     # Simulate 7-day weather forecast
     base_date = datetime.now()
@@ -823,10 +925,11 @@ def generate_farming_advisory(temp, rain_prob):
     return "; ".join(advisories)
 
 # Real-time sensor data endpoint
-@app.route('/api/sensor-data')
+@bp.route('/api/sensor-data')
 def get_sensor_data():
-    # Return recent sensor data
-    recent_data = sensor_data_history[-10:] if sensor_data_history else []
+    # Return recent sensor data (up to the 100 readings kept in history)
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    recent_data = sensor_data_history[-limit:] if sensor_data_history else []
     
     # Calculate averages
     if recent_data:
@@ -841,23 +944,195 @@ def get_sensor_data():
         avg_data = {'soil_moisture': 0, 'soil_temperature': 0, 'ambient_temperature': 0, 'humidity': 0, 'soil_ph': 0}
     
     return jsonify({
-        'recent_readings': recent_data,
+        'recent_readings': wire.to_columnar(recent_data, wire.SENSOR_PRECISION, wire.SENSOR_COLUMNS) if wire.wants_columnar() else recent_data,
         'averages': avg_data,
         'status': 'online' if recent_data else 'offline',
         'last_update': recent_data[-1]['timestamp'] if recent_data else None
     })
 
+# Bulk farm data import
+@bp.route('/api/import-farm-data', methods=['POST'])
+def import_farm_data():
+    ensure_models()
+    if crop_model is None and yield_model is None:
+        return jsonify({'error': 'No prediction models are loaded'}), 503
+
+    # Multipart bodies are spooled to disk as soon as request.files is read,
+    # so a full backlog is turned away before that as well
+    max_pending = current_app.config['IMPORT_MAX_PENDING_JOBS']
+    if import_jobs.pending() >= max_pending:
+        return import_backlog_response()
+
+    # Small files can come as multipart uploads; large ones as a raw request
+    # body (?filename=fields.csv), which is streamed to disk and is not bound
+    # by MAX_CONTENT_LENGTH
+    upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+    filename = secure_filename(upload.filename if upload else request.args.get('filename', ''))
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in farm_import.SUPPORTED_EXTENSIONS:
+        return jsonify({'error': 'Upload a .csv or .parquet file'}), 400
+    if extension == '.parquet' and importlib.util.find_spec('pyarrow') is None:
+        return jsonify({'error': 'Parquet import requires pyarrow; upload a CSV file instead'}), 400
+
+    length = request.content_length
+    if not upload:
+        if length is None:
+            return jsonify({'error': 'Content-Length is required'}), 411
+        if length > current_app.config['IMPORT_MAX_CONTENT_LENGTH']:
+            return jsonify({'error': 'File too large'}), 413
+
+    import_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'imports')
+    os.makedirs(import_dir, exist_ok=True)
+    job = farm_import.ImportJob(filename, import_dir)
+
+    # Reserved before the file is written, so a backlog can't fill the disk
+    if not import_jobs.add(job, max_pending=max_pending):
+        return import_backlog_response()
+
+    try:
+        if upload:
+            upload.save(job.input_path)
+        else:
+            stream = request.environ['wsgi.input']
+            with open(job.input_path, 'wb') as f:
+                remaining = length
+                while remaining > 0:
+                    block = stream.read(min(remaining, 1024 * 1024))
+                    if not block:
+                        break
+                    f.write(block)
+                    remaining -= len(block)
+            if remaining > 0:
+                # The client went away mid-upload; don't predict on a partial file
+                import_jobs.discard(job)
+                return jsonify({'error': 'Upload ended before Content-Length bytes were received'}), 400
+        job.input_bytes = os.path.getsize(job.input_path)
+    except Exception:
+        import_jobs.discard(job)
+        raise
+
+    socketio.start_background_task(
+        run_import_job, job, current_app.extensions['import_slots'], current_app.config['IMPORT_CHUNK_SIZE']
+    )
+    return jsonify(dict(
+        job.to_dict(),
+        status_url=url_for('main.import_status', job_id=job.id),
+        download_url=url_for('main.import_download', job_id=job.id)
+    )), 202
+
+@bp.route('/api/import-farm-data/<job_id>')
+def import_status(job_id):
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Import job not found'}), 404
+    preview = list(job.preview)
+    return jsonify(dict(
+        job.to_dict(),
+        preview=wire.to_columnar(preview, farm_import.RESULT_PRECISION) if wire.wants_columnar() else preview,
+        download_url=url_for('main.import_download', job_id=job.id) if job.state == 'completed' else None
+    ))
+
+@bp.route('/api/import-farm-data/<job_id>/download')
+def import_download(job_id):
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Import job not found'}), 404
+    if job.state != 'completed':
+        return jsonify({'error': f'Import job is {job.state}'}), 409
+    download_name = f"{os.path.splitext(job.filename)[0]}-predictions.csv"
+    return send_file(os.path.abspath(job.output_path), mimetype='text/csv', as_attachment=True, download_name=download_name)
+
+def import_backlog_response():
+    return jsonify({'error': 'Too many imports in progress, please retry', 'reason': 'import_backlog'}), \
+        503, {'Retry-After': str(current_app.config['IMPORT_RETRY_AFTER'])}
+
+def run_import_job(job, slots, chunk_size):
+    # Jobs beyond IMPORT_MAX_CONCURRENT_JOBS stay queued until a slot frees up
+    with slots:
+        models = SimpleNamespace(
+            crop_model=crop_model, yield_model=yield_model, scaler=scaler,
+            label_encoders=label_encoders, numerical_features=numerical_features
+        )
+        farm_import.run_import(job, models, chunk_size, emit_import_progress)
+
+def emit_import_progress(job):
+    socketio.emit('import_progress', job.to_dict(), to=f'import:{job.id}')
+
 # SocketIO Events
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
+    join_room('sensor_json')
     emit('status', {'msg': 'Connected to IoT monitoring system'})
 
+@socketio.on('sensor_format')
+def handle_sensor_format(data):
+    # Clients on metered links can switch to compact value arrays
+    if (data or {}).get('format') == 'columnar':
+        leave_room('sensor_json')
+        join_room('sensor_compact')
+        emit('sensor_schema', wire.schema(wire.SENSOR_COLUMNS, wire.SENSOR_PRECISION))
+    else:
+        leave_room('sensor_compact')
+        join_room('sensor_json')
+
+@socketio.on('watch_import')
+def handle_watch_import(data):
+    job = import_jobs.get((data or {}).get('job_id'))
+    if job is None:
+        emit('import_progress', {'job_id': (data or {}).get('job_id'), 'state': 'not_found'})
+        return
+    join_room(f'import:{job.id}')
+    emit('import_progress', job.to_dict())
+
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
 
+def create_app(config=None):
+    app = Flask(__name__, template_folder="templates", static_folder="static")
+    app.config['SECRET_KEY'] = 'your-secret-key-here'
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    app.config['GAMIFICATION_DB'] = os.environ.get('GAMIFICATION_DB', 'gamification.db')
+    app.config['WARM_UP'] = os.environ.get('AGRITECH_WARM_UP') == '1'
+    app.config['BACKGROUND_TASKS'] = os.environ.get('AGRITECH_BACKGROUND_TASKS') == '1'
+    app.config['IMPORT_CHUNK_SIZE'] = 5000  # rows per model batch
+    app.config['IMPORT_MAX_CONTENT_LENGTH'] = 1024 * 1024 * 1024  # 1GB raw-body imports
+    app.config['IMPORT_MAX_CONCURRENT_JOBS'] = 2
+    app.config['IMPORT_MAX_PENDING_JOBS'] = 10  # queued + running before new imports get a 503
+    app.config['IMPORT_RETRY_AFTER'] = 30  # seconds
+    if config:
+        app.config.update(config)
+
+    # Per-route latency histograms, spans and /metrics
+    instrumentation.init_app(app)
+    # gzip/deflate (or brotli when installed) for responses above COMPRESS_MIN_SIZE
+    wire.init_app(app)
+    # Per-client token buckets and per-cost-class concurrency limits
+    admission.init_app(app, route_costs)
+
+    # The SQLite database is opened on first use, not here
+    gamification_store = GamificationStore(app.config['GAMIFICATION_DB'], seed_users=seed_users)
+    app.extensions['gamification'] = gamification_store
+    app.extensions['import_slots'] = threading.BoundedSemaphore(app.config['IMPORT_MAX_CONCURRENT_JOBS'])
+    atexit.register(gamification_store.flush)
+
+    app.register_blueprint(bp)
+    socketio.init_app(app, cors_allowed_origins="*")
+
+    if app.config['WARM_UP']:
+        warm_up()
+    # For servers that import the factory (gunicorn etc.); python app.py starts them below
+    if app.config['BACKGROUND_TASKS']:
+        start_background_tasks(app)
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
+    warm_up()
+    start_background_tasks(app)
+    
     print("🌱 AgriTech Pro Server Starting...")
     print("🚀 Features enabled:")
     print("   ✅ Real-time IoT monitoring")
@@ -0,0 +1,495 @@
+"""Offline benchmark and load-test suite for AgriTech Pro.
+
+Gemini is replaced by a stub, the ML models by small synthetic sklearn models
+and the crop images / ledger by generated data, so runs are reproducible and
+need no network or model files.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --output new.json --compare results.json
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CROPS = ['Rice', 'Wheat', 'Cotton', 'Maize', 'Sugarcane', 'Groundnut', 'Millet', 'Pulses']
+SEASONS = ['Kharif', 'Rabi', 'Zaid', 'Whole Year']
+STATES = ['Tamil Nadu', 'Punjab', 'Karnataka', 'Maharashtra', 'Andhra Pradesh', 'Kerala']
+
+GEMINI_REPLY = (
+    "* **Soil testing**: Test soil every season and correct pH with lime or gypsum.\n\n"
+    "* **Fertilizer**: Split nitrogen doses across the growing period.\n"
+    "* **Irrigation**: Switch to drip irrigation during dry spells.\n\n"
+    "* **Pests**: Scout weekly and use pheromone traps before spraying.\n"
+    "* **Residue**: Incorporate crop residue to build organic matter."
+)
+
+
+class StubGeminiResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGemini:
+    """Stands in for GenerativeModel, optionally sleeping to mimic network latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        return StubGeminiResponse(GEMINI_REPLY)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, wall_time):
+    latencies = sorted(latencies)
+    return {
+        'n': len(latencies),
+        'ops_per_sec': round(len(latencies) / wall_time, 2) if wall_time else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4)
+    }
+
+
+def time_calls(fn, iterations, warmup=5):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_concurrent(fn, requests, concurrency):
+    """Run fn() `requests` times across a thread pool; fn returns False on failure"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(_):
+        nonlocal errors
+        t0 = time.perf_counter()
+        ok = fn()
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(requests)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result['concurrency'] = concurrency
+    result['errors'] = errors
+    return result
+
+
+# Fixtures
+
+def make_label_encoders():
+    from sklearn.preprocessing import LabelEncoder
+    return {
+        'crop': LabelEncoder().fit(CROPS),
+        'season': LabelEncoder().fit(SEASONS),
+        'state': LabelEncoder().fit(STATES)
+    }
+
+
+def random_field(rng):
+    return {
+        'year': int(rng.integers(2015, 2025)),
+        'area': round(float(rng.uniform(0.5, 20)), 2),
+        'N': round(float(rng.uniform(10, 140)), 1),
+        'P': round(float(rng.uniform(5, 80)), 1),
+        'K': round(float(rng.uniform(5, 120)), 1),
+        'pH': round(float(rng.uniform(5.0, 8.5)), 2),
+        'avg_temp_c': round(float(rng.uniform(15, 38)), 1),
+        'total_rainfall_mm': round(float(rng.uniform(200, 2500)), 1),
+        'avg_humidity_percent': round(float(rng.uniform(30, 95)), 1),
+        'crop': CROPS[int(rng.integers(len(CROPS)))],
+        'season': SEASONS[int(rng.integers(len(SEASONS)))],
+        'state': STATES[int(rng.integers(len(STATES)))]
+    }
+
+
+def make_models(encoders, n_features, rng, n_samples=2000):
+    """Fit small random forests on synthetic data shaped like the real feature rows"""
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    X = rng.normal(size=(n_samples, n_features + 2))
+    crop_labels = rng.integers(len(encoders['crop'].classes_), size=n_samples)
+    scaler = StandardScaler().fit(X)
+    crop_model = RandomForestClassifier(n_estimators=50, max_depth=8, random_state=0).fit(scaler.transform(X), crop_labels)
+
+    X_yield = rng.normal(size=(n_samples, n_features + 3))
+    yields = rng.uniform(1.5, 9.0, size=n_samples)
+    yield_model = RandomForestRegressor(n_estimators=50, max_depth=8, random_state=0).fit(X_yield, yields)
+    return crop_model, yield_model, scaler
+
+
+def make_image(width, height, rng, fmt='JPEG'):
+    """Mostly green canopy with yellow and brown patches, encoded like an upload"""
+    from PIL import Image
+
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    img[..., 0] = rng.integers(20, 90, size=(height, width))
+    img[..., 1] = rng.integers(100, 200, size=(height, width))
+    img[..., 2] = rng.integers(20, 80, size=(height, width))
+    for _ in range(20):
+        y, x = int(rng.integers(height)), int(rng.integers(width))
+        img[y:y + height // 10, x:x + width // 10] = (rng.integers(150, 220), rng.integers(120, 180), 30)
+    buf = io.BytesIO()
+    Image.fromarray(img).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def make_sensor_reading(rng, when=None):
+    return {
+        'timestamp': (when or datetime.now()).isoformat(),
+        'soil_moisture': float(rng.uniform(20, 80)), 'soil_temperature': float(rng.uniform(15, 35)),
+        'soil_ph': float(rng.uniform(5.5, 8.5)), 'ambient_temperature': float(rng.uniform(18, 40)),
+        'humidity': float(rng.uniform(30, 95)), 'light_intensity': float(rng.uniform(0, 2000)),
+        'wind_speed': float(rng.uniform(0, 25)),
+        'npk_levels': {'nitrogen': float(rng.uniform(10, 50)), 'phosphorus': float(rng.uniform(5, 30)),
+                       'potassium': float(rng.uniform(15, 45))},
+        'weather_condition': 'sunny', 'uv_index': float(rng.uniform(0, 11))
+    }
+
+
+def make_ledger_record(i, previous_hash, rng):
+    planting = datetime(2024, 1, 1) + timedelta(days=int(rng.integers(0, 365)))
+    record = {
+        'id': i,
+        'timestamp': datetime(2024, 1, 1).isoformat(),
+        'farmer_id': f'FARM{1000 + i % 9000}',
+        'farmer_name': f'Farmer {i}',
+        'crop_type': CROPS[i % len(CROPS)],
+        'variety': 'Standard',
+        'location': STATES[i % len(STATES)],
+        'coordinates': {'lat': 11.0, 'lng': 78.0},
+        'planting_date': planting.strftime('%Y-%m-%d'),
+        'expected_harvest': (planting + timedelta(days=120)).strftime('%Y-%m-%d'),
+        'area_hectares': 2.5,
+        'certifications': ['Organic', 'Non-GMO'],
+        'predicted_yield': 5.0,
+        'farming_practices': ['Sustainable Agriculture', 'IPM'],
+        'soil_data': {'pH': 6.5, 'organic_matter': 3.2, 'nitrogen': 30, 'phosphorus': 20, 'potassium': 200},
+        'previous_hash': previous_hash
+    }
+    record['hash'] = hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+    return record
+
+
+def load_app(args, rng):
+    """Import app.py inside a scratch directory and swap in the offline fixtures"""
+    workdir = tempfile.mkdtemp(prefix='agritech-bench-')
+    os.environ['GAMIFICATION_DB'] = os.path.join(workdir, 'gamification.db')
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    t0 = time.perf_counter()
+    import app as app_module
+    import_seconds = time.perf_counter() - t0
+    # Every benchmark request comes from one client, so rate limits are off unless asked for
+    flask_app = app_module.create_app({'ADMISSION_ENABLED': args.admission})
+    # Run the lazy model load first so it does not overwrite the fixtures later
+    app_module.ensure_models()
+
+    encoders = make_label_encoders()
+    crop_model, yield_model, scaler = make_models(encoders, len(app_module.numerical_features), rng)
+    app_module.label_encoders.clear()
+    app_module.label_encoders.update(encoders)
+    app_module.crop_model = crop_model
+    app_module.yield_model = yield_model
+    app_module.scaler = scaler
+    app_module.gemini = StubGemini(latency=args.llm_latency / 1000)
+
+    ledger = app_module.blockchain_ledger
+    ledger.clear()
+    previous_hash = '0'
+    for i in range(1, args.ledger_size + 1):
+        record = make_ledger_record(i, previous_hash, rng)
+        ledger.append(record)
+        previous_hash = record['hash']
+    return app_module, flask_app, import_seconds
+
+
+# Scenarios
+
+def micro_benchmarks(app_module, args, rng):
+    results = {}
+    field = random_field(rng)
+    results['micro.encode_label'] = time_calls(
+        lambda: app_module.encode_label('state', field['state']), args.iterations)
+    results['micro.format_bullets'] = time_calls(
+        lambda: app_module.format_bullets(GEMINI_REPLY), args.iterations)
+
+    record = dict(app_module.blockchain_ledger[-1]) if app_module.blockchain_ledger else make_ledger_record(1, '0', rng)
+    record.pop('hash', None)
+    results['micro.ledger_hash'] = time_calls(
+        lambda: hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest(),
+        args.iterations)
+
+    import gzip
+    import wire
+    history = [make_sensor_reading(rng, datetime(2024, 1, 1) + timedelta(seconds=10 * i)) for i in range(100)]
+    result = time_calls(lambda: wire.to_columnar(history, wire.SENSOR_PRECISION, wire.SENSOR_COLUMNS), args.iterations)
+    as_json = json.dumps(history).encode()
+    as_columnar = json.dumps(wire.to_columnar(history, wire.SENSOR_PRECISION, wire.SENSOR_COLUMNS)).encode()
+    result.update({
+        'bytes_json': len(as_json), 'bytes_json_gzip': len(gzip.compress(as_json)),
+        'bytes_columnar': len(as_columnar), 'bytes_columnar_gzip': len(gzip.compress(as_columnar))
+    })
+    results['micro.sensor_history_columnar'] = result
+
+    import farm_import
+    from types import SimpleNamespace
+    models = SimpleNamespace(
+        crop_model=app_module.crop_model, yield_model=app_module.yield_model, scaler=app_module.scaler,
+        label_encoders=app_module.label_encoders, numerical_features=app_module.numerical_features
+    )
+    lookups = {col: farm_import._encoder_lookup(models.label_encoders, col) for col in ('crop', 'season', 'state')}
+    rows = [{k: str(v) for k, v in random_field(rng).items()} for _ in range(5000)]
+    result = time_calls(lambda: farm_import.predict_chunk(rows, models, lookups), max(3, args.iterations // 100), warmup=1)
+    result['rows_per_call'] = len(rows)
+    results['micro.import_predict_chunk.5000'] = result
+
+    import cv2
+    from PIL import Image
+    for width, height in ((640, 480), (1920, 1080), (4000, 3000)):
+        img = np.array(Image.open(io.BytesIO(make_image(width, height, rng))))
+        img_cv = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        results[f'micro.analyze_crop_health.{width}x{height}'] = time_calls(
+            lambda: app_module.analyze_crop_health(img_cv), max(10, args.iterations // 20), warmup=2)
+    return results
+
+
+def http_benchmarks(app_module, flask_app, args, rng):
+    results = {}
+    fields = [random_field(rng) for _ in range(256)]
+    # One field per request, so http.recommend_crop keeps measuring the
+    # uncached model + Gemini path rather than recommendation cache hits
+    unique_fields = iter([random_field(rng) for _ in range(args.requests * len(args.concurrency))])
+    images = [make_image(1280, 960, rng) for _ in range(4)]
+    ledger_size = len(app_module.blockchain_ledger)
+    local = threading.local()
+
+    def client():
+        # Flask test clients are not thread-safe; give each worker its own
+        if not hasattr(local, 'client'):
+            local.client = flask_app.test_client()
+        return local.client
+
+    def post_json(path, payload_fn):
+        return lambda: client().post(path, json=payload_fn()).status_code == 200
+
+    scenarios = {
+        'http.predict_yield': post_json('/predict_yield', lambda: random.choice(fields)),
+        'http.recommend_crop': post_json('/recommend_crop', lambda: next(unique_fields)),
+        # A handful of neighbouring fields, as from one region, mostly hit the recommendation cache
+        'http.recommend_crop_clustered': post_json('/recommend_crop', lambda: random.choice(fields[:8])),
+        'http.create_crop_record': post_json('/api/create-crop-record', lambda: {
+            'farmer_id': f'FARM{random.randint(1000, 9999)}', 'crop_type': random.choice(CROPS),
+            'location': random.choice(STATES), 'area_hectares': round(random.uniform(0.5, 5), 2)
+        }),
+        'http.trace_crop': lambda: client().get(
+            f'/api/trace-crop/{random.randint(1, max(1, ledger_size))}').status_code == 200,
+        'http.crop_health_analysis': lambda: client().post(
+            '/crop-health-analysis',
+            data={'image': (io.BytesIO(random.choice(images)), 'leaf.jpg')},
+            content_type='multipart/form-data'
+        ).status_code == 200,
+        'http.sensor_data': lambda: client().get('/api/sensor-data').status_code == 200,
+        'http.analytics_dashboard': lambda: client().get('/api/analytics-dashboard').status_code == 200
+    }
+    for name, fn in scenarios.items():
+        requests = args.requests if 'crop_health' not in name else max(20, args.requests // 10)
+        for concurrency in args.concurrency:
+            # Every run starts cold; the clustered scenario warms its own entries
+            app_module.recommendation_cache.clear()
+            results[f'{name}.c{concurrency}'] = run_concurrent(fn, requests, concurrency)
+    return results
+
+
+def socketio_benchmarks(app_module, flask_app, args, rng):
+    socketio = app_module.socketio
+    results = {}
+
+    def connect():
+        c = socketio.test_client(flask_app)
+        ok = c.is_connected()
+        c.disconnect()
+        return ok
+
+    results['socketio.connect'] = run_concurrent(connect, args.requests, 1)
+
+    import wire
+    reading = make_sensor_reading(rng)
+    for compact in (False, True):
+        for n_clients in (1, 10, 50):
+            clients = [socketio.test_client(flask_app) for _ in range(n_clients)]
+            for c in clients:
+                if compact:
+                    c.emit('sensor_format', {'format': 'columnar'})
+                c.get_received()
+
+            def fanout():
+                # Same pair of room emits as the sensor simulation loop
+                socketio.emit('sensor_update', reading, to='sensor_json')
+                socketio.emit('sensor_update_compact',
+                              wire.encode_row(reading, wire.SENSOR_COLUMNS, wire.SENSOR_PRECISION),
+                              to='sensor_compact')
+                return all(c.get_received() for c in clients)
+
+            result = time_calls(fanout, args.iterations // 5 or 1)
+            result['clients'] = n_clients
+            name = 'sensor_update_compact' if compact else 'sensor_update'
+            results[f'socketio.{name}_fanout.{n_clients}'] = result
+            for c in clients:
+                c.disconnect()
+    return results
+
+
+def cold_start_benchmark(code, repeats=3):
+    """Time a fresh interpreter running `code`, as a worker or test run would"""
+    samples = []
+    workdir = tempfile.mkdtemp(prefix='agritech-cold-')
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, GAMIFICATION_DB=os.path.join(workdir, 'gamification.db'))
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env, capture_output=True)
+        if proc.returncode != 0:
+            return {'error': proc.stderr.decode(errors='replace')[-500:]}
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, sum(samples))
+
+
+# Reporting
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Return a list of (name, metric, old, new) for results slower than baseline by > threshold"""
+    regressions = []
+    for name, new in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old or 'p50_ms' not in old or 'p50_ms' not in new:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if old[metric] and new[metric] > old[metric] * (1 + threshold):
+                regressions.append((name, metric, old[metric], new[metric]))
+        if old.get('ops_per_sec') and new['ops_per_sec'] < old['ops_per_sec'] * (1 - threshold):
+            regressions.append((name, 'ops_per_sec', old['ops_per_sec'], new['ops_per_sec']))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--output', default='bench_results.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='baseline JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown before flagging (0.15 = 15%%)')
+    parser.add_argument('--only', nargs='+', choices=['cold', 'micro', 'http', 'socketio'],
+                        default=['cold', 'micro', 'http', 'socketio'])
+    parser.add_argument('--iterations', type=int, default=500, help='iterations per micro-benchmark')
+    parser.add_argument('--requests', type=int, default=300, help='requests per HTTP scenario')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8], help='HTTP worker counts')
+    parser.add_argument('--ledger-size', type=int, default=5000, help='synthetic ledger records')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='stub Gemini latency in ms')
+    parser.add_argument('--admission', action='store_true', help='keep admission control and rate limits enabled')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+
+    results = {}
+    if 'cold' in args.only:
+        results['startup.cold_import'] = cold_start_benchmark('import app')
+        results['startup.cold_create_app'] = cold_start_benchmark('import app; app.create_app()')
+        results['startup.cold_warm_up'] = cold_start_benchmark('import app; app.create_app(); app.warm_up()')
+
+    app_module, flask_app, import_seconds = load_app(args, rng)
+    results['startup.in_process_import'] = {'seconds': round(import_seconds, 4)}
+    if 'micro' in args.only:
+        results.update(micro_benchmarks(app_module, args, rng))
+    if 'http' in args.only:
+        results.update(http_benchmarks(app_module, flask_app, args, rng))
+    if 'socketio' in args.only:
+        results.update(socketio_benchmarks(app_module, flask_app, args, rng))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')}
+        },
+        'results': results
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in results.items():
+        if 'p50_ms' in result:
+            print(f"{name:55s} {result['ops_per_sec']:>10.1f} ops/s  p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms")
+        else:
+            print(f"{name:55s} {result}")
+    print(f"\nResults written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name} {metric}: {old} -> {new}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {baseline_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
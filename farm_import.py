@@ -0,0 +1,237 @@
+import csv
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from instrumentation import span
+
+SUPPORTED_EXTENSIONS = {'.csv', '.parquet'}
+PREVIEW_ROWS = 20
+TOP_K = 3
+PENDING_STATES = {'queued', 'running'}
+
+# Decimal places kept when a job preview is sent in the compact wire format
+RESULT_PRECISION = {
+    'confidence_1': 4, 'confidence_2': 4, 'confidence_3': 4, 'predicted_yield': 2
+}
+RESULT_COLUMNS = [
+    'recommended_crop_1', 'confidence_1',
+    'recommended_crop_2', 'confidence_2',
+    'recommended_crop_3', 'confidence_3',
+    'predicted_yield'
+]
+
+
+class ImportJob:
+    def __init__(self, filename, import_dir):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        extension = os.path.splitext(filename)[1].lower()
+        self.input_path = os.path.join(import_dir, f'{self.id}-input{extension}')
+        self.output_path = os.path.join(import_dir, f'{self.id}-predictions.csv')
+        self.input_bytes = 0
+        self.state = 'queued'
+        self.rows_processed = 0
+        self.progress = 0.0
+        self.error = None
+        self.preview = []
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'input_bytes': self.input_bytes,
+            'state': self.state,
+            'rows_processed': self.rows_processed,
+            'progress': round(self.progress, 4),
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobRegistry:
+    """Keeps the most recent import jobs; older finished ones are dropped with their files"""
+
+    def __init__(self, max_jobs=100):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def add(self, job, max_pending=None):
+        """Register a job, or return False if max_pending jobs are already queued or running"""
+        with self._lock:
+            if max_pending is not None:
+                pending = sum(1 for j in self._jobs.values() if j.state in PENDING_STATES)
+                if pending >= max_pending:
+                    return False
+            self._jobs[job.id] = job
+            # Queued and running jobs still own their files, so only finished ones are evicted
+            overflow = len(self._jobs) - self.max_jobs
+            if overflow > 0:
+                finished = [j for j in self._jobs.values() if j.state not in PENDING_STATES][:overflow]
+                for old in finished:
+                    del self._jobs[old.id]
+                    _remove_files(old)
+        return True
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.state in PENDING_STATES)
+
+    def discard(self, job):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        _remove_files(job)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+def _remove_files(job):
+    for path in (job.input_path, job.output_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _count_chars(f, counter):
+    for line in f:
+        counter[0] += len(line)
+        yield line
+
+
+def iter_csv_chunks(path, chunk_size):
+    """Yield (fieldnames, rows, fraction_read) without loading the whole file"""
+    size = os.path.getsize(path) or 1
+    consumed = [0]
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        # Surplus cells on ragged rows are collected under '_extra' and not written back
+        reader = csv.DictReader(_count_chars(f, consumed), restkey='_extra')
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield reader.fieldnames, chunk, min(1.0, consumed[0] / size)
+                chunk = []
+        if chunk:
+            yield reader.fieldnames, chunk, 1.0
+
+
+def iter_parquet_chunks(path, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet import requires the optional pyarrow package")
+    parquet_file = pq.ParquetFile(path)
+    total = parquet_file.metadata.num_rows or 1
+    fieldnames = parquet_file.schema_arrow.names
+    done = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        rows = batch.to_pylist()
+        done += len(rows)
+        yield fieldnames, rows, min(1.0, done / total)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _encoder_lookup(label_encoders, col):
+    # One dict lookup per value instead of a LabelEncoder.transform call per row
+    if col not in label_encoders:
+        return {}
+    return {str(c): i for i, c in enumerate(label_encoders[col].classes_)}
+
+
+def _encode_column(rows, col, lookup):
+    return np.fromiter((lookup.get(str(r.get(col) or ''), -1) for r in rows), dtype=float, count=len(rows))
+
+
+def predict_chunk(rows, models, lookups):
+    """Run recommendation and yield models over a chunk of field records at once"""
+    n = len(rows)
+    numeric = np.array([[_to_float(r.get(f)) for f in models.numerical_features] for r in rows], dtype=float)
+    season = _encode_column(rows, 'season', lookups['season'])
+    state = _encode_column(rows, 'state', lookups['state'])
+    # None rather than '' so missing results stay null in the columnar preview;
+    # csv.DictWriter still writes them as empty cells
+    results = [dict.fromkeys(RESULT_COLUMNS) for _ in range(n)]
+    top_crop = [None] * n
+
+    if models.crop_model is not None and models.scaler is not None and 'crop' in models.label_encoders:
+        with span('import.crop_model.predict_proba'):
+            probs = models.crop_model.predict_proba(models.scaler.transform(np.column_stack([numeric, season, state])))
+        k = min(TOP_K, probs.shape[1])
+        # argpartition finds the top k in O(classes); only those k are then sorted
+        top_idx = np.argpartition(probs, -k, axis=1)[:, -k:]
+        top_probs = np.take_along_axis(probs, top_idx, axis=1)
+        order = np.argsort(-top_probs, axis=1)
+        top_idx = np.take_along_axis(top_idx, order, axis=1)
+        top_probs = np.take_along_axis(top_probs, order, axis=1)
+        names = np.asarray(models.label_encoders['crop'].classes_)[top_idx]
+        for i in range(n):
+            for j in range(k):
+                results[i][f'recommended_crop_{j + 1}'] = names[i, j]
+                results[i][f'confidence_{j + 1}'] = round(float(top_probs[i, j]), 4)
+            top_crop[i] = names[i, 0]
+
+    if models.yield_model is not None:
+        crop_lookup = lookups['crop']
+        crop = np.fromiter(
+            (crop_lookup.get(str(r.get('crop') or top_crop[i] or ''), -1) for i, r in enumerate(rows)),
+            dtype=float, count=n
+        )
+        with span('import.yield_model.predict'):
+            yields = models.yield_model.predict(np.column_stack([numeric, crop, season, state]))
+        for i in range(n):
+            results[i]['predicted_yield'] = round(float(yields[i]), 2)
+
+    return results
+
+
+def run_import(job, models, chunk_size, on_progress):
+    """Stream the job's input file through the models into its output CSV"""
+    job.state = 'running'
+    on_progress(job)
+    lookups = {col: _encoder_lookup(models.label_encoders, col) for col in ('crop', 'season', 'state')}
+    chunks = (iter_parquet_chunks(job.input_path, chunk_size)
+              if job.input_path.endswith('.parquet')
+              else iter_csv_chunks(job.input_path, chunk_size))
+    try:
+        with open(job.output_path, 'w', newline='') as out:
+            writer = None
+            for fieldnames, rows, fraction in chunks:
+                if writer is None:
+                    columns = [c for c in fieldnames if c not in RESULT_COLUMNS] + RESULT_COLUMNS
+                    writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+                    writer.writeheader()
+                with span('import.chunk'):
+                    results = predict_chunk(rows, models, lookups)
+                    for row, result in zip(rows, results):
+                        row.update(result)
+                    writer.writerows(rows)
+                if len(job.preview) < PREVIEW_ROWS:
+                    job.preview.extend(rows[:PREVIEW_ROWS - len(job.preview)])
+                job.rows_processed += len(rows)
+                job.progress = fraction
+                on_progress(job)
+        job.state = 'completed'
+        job.progress = 1.0
+    except Exception as e:
+        job.state = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = datetime.now().isoformat()
+        if os.path.exists(job.input_path):
+            os.remove(job.input_path)
+        on_progress(job)
@@ -0,0 +1,233 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+
+
+class _PointCounts:
+    """Fenwick tree of how many users hold each point value.
+
+    Counting the users at or below a score is a prefix sum, so both updates
+    and rank lookups are O(log P) in the largest point value, whatever the
+    number of users. The tree doubles in size when a score outgrows it.
+    """
+
+    def __init__(self, size=512):
+        self.size = size
+        self._tree = [0] * (size + 1)
+
+    def add(self, points, delta):
+        while points >= self.size:
+            self._grow()
+        i = points + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def at_most(self, points):
+        i = min(points, self.size - 1) + 1
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _grow(self):
+        counts = [self.at_most(p) - self.at_most(p - 1) for p in range(self.size)]
+        self.size *= 2
+        self._tree = [0] * (self.size + 1)
+        for points, count in enumerate(counts):
+            if count:
+                self.add(points, count)
+
+
+class GamificationStore:
+    """Thread-safe user points and achievements, persisted to SQLite.
+
+    Reads and writes are served from memory; changed users are written back
+    in batches. Points are small bounded integers, so users are grouped into
+    one bucket per point value with a Fenwick tree of bucket sizes: an award
+    moves a user between buckets in O(log P), rank() is a prefix sum and
+    leaderboard() walks the non-empty buckets from the top. Users with equal
+    points share a rank and are listed in the order they reached the score.
+    Every user's points and achievements are held in memory (a few hundred
+    bytes per user), and SQLite is only read once at startup, so it has no
+    index on points to maintain.
+    """
+
+    def __init__(self, db_path, batch_size=500, flush_interval=5.0, seed_users=None):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.seed_users = seed_users or {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # Held for a whole flush so two flushes can't write their snapshots out of order
+        self._flush_lock = threading.Lock()
+        self._conn = None
+        self._loaded = False
+        self._points = {}
+        self._earned = {}
+        self._by_points = {}
+        self._counts = _PointCounts()
+        self._dirty_users = set()
+        self._pending_achievements = []
+        self._last_flush = time.monotonic()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_points ("
+            "user_id TEXT PRIMARY KEY, points INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_achievements ("
+            "user_id TEXT NOT NULL, achievement TEXT NOT NULL, earned_at TEXT NOT NULL, "
+            "PRIMARY KEY (user_id, achievement))"
+        )
+        # Rankings are served from memory; an index here would only slow writes
+        conn.execute("DROP INDEX IF EXISTS idx_user_points_points")
+        conn.commit()
+        return conn
+
+    def _ensure_loaded(self):
+        # Called with self._lock held; the database is only touched on first use
+        if self._loaded:
+            return
+        with self._db_lock:
+            self._conn = self._connect()
+            for user_id, points in self._conn.execute("SELECT user_id, points FROM user_points"):
+                self._points[user_id] = points
+            for user_id, achievement in self._conn.execute("SELECT user_id, achievement FROM user_achievements"):
+                self._earned.setdefault(user_id, set()).add(achievement)
+
+        for user_id, (points, earned) in self.seed_users.items():
+            if user_id not in self._points:
+                self._points[user_id] = points
+                self._earned[user_id] = set(earned)
+                self._dirty_users.add(user_id)
+                now = datetime.now().isoformat()
+                self._pending_achievements.extend((user_id, a, now) for a in earned)
+
+        for user_id, points in self._points.items():
+            self._place(user_id, points)
+        self._loaded = True
+
+    def _place(self, user_id, points):
+        # Buckets are dicts used as insertion-ordered sets
+        self._by_points.setdefault(points, {})[user_id] = None
+        self._counts.add(points, 1)
+
+    def _unplace(self, user_id, points):
+        bucket = self._by_points[points]
+        del bucket[user_id]
+        if not bucket:
+            del self._by_points[points]
+        self._counts.add(points, -1)
+
+    def _users_above(self, points):
+        return len(self._points) - self._counts.at_most(points)
+
+    def get_points(self, user_id):
+        with self._lock:
+            self._ensure_loaded()
+            return self._points.get(user_id, 0)
+
+    def get_progress(self, user_id):
+        with self._lock:
+            self._ensure_loaded()
+            return self._points.get(user_id, 0), frozenset(self._earned.get(user_id, ()))
+
+    def award(self, user_id, achievement, points):
+        """Atomically grant an achievement once per user.
+
+        Returns (old_points, new_points), or None if it was already earned.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            earned = self._earned.setdefault(user_id, set())
+            if achievement in earned:
+                return None
+            earned.add(achievement)
+
+            old_points = self._points.get(user_id)
+            if old_points is not None:
+                self._unplace(user_id, old_points)
+            else:
+                old_points = 0
+            new_points = old_points + points
+            self._points[user_id] = new_points
+            self._place(user_id, new_points)
+
+            self._dirty_users.add(user_id)
+            self._pending_achievements.append((user_id, achievement, datetime.now().isoformat()))
+            should_flush = (len(self._dirty_users) >= self.batch_size
+                            or time.monotonic() - self._last_flush >= self.flush_interval)
+
+        if should_flush:
+            self.flush()
+        return old_points, new_points
+
+    def leaderboard(self, limit=10, offset=0):
+        # Whole buckets are skipped by size; only an offset that lands inside a
+        # bucket of tied users is stepped through one user at a time
+        with self._lock:
+            self._ensure_loaded()
+            entries = []
+            above = 0
+            for points in sorted(self._by_points, reverse=True):
+                bucket = self._by_points[points]
+                if offset >= len(bucket):
+                    offset -= len(bucket)
+                else:
+                    for user_id in islice(bucket, offset, offset + limit - len(entries)):
+                        entries.append({'rank': above + 1, 'user': user_id, 'points': points})
+                    offset = 0
+                    if len(entries) >= limit:
+                        break
+                above += len(bucket)
+            return entries
+
+    def rank(self, user_id):
+        with self._lock:
+            self._ensure_loaded()
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            return self._users_above(points) + 1
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            if not self._loaded or (not self._dirty_users and not self._pending_achievements):
+                return
+            rows = [(user_id, self._points[user_id]) for user_id in self._dirty_users]
+            achievements = self._pending_achievements
+            self._dirty_users = set()
+            self._pending_achievements = []
+            self._last_flush = time.monotonic()
+
+        try:
+            with self._db_lock, self._conn:
+                # Points only ever grow, so an older snapshot can never win
+                self._conn.executemany(
+                    "INSERT INTO user_points (user_id, points) VALUES (?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET points = MAX(points, excluded.points)",
+                    rows
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO user_achievements (user_id, achievement, earned_at) VALUES (?, ?, ?)",
+                    achievements
+                )
+        except sqlite3.Error as e:
+            print(f"Warning: failed to persist gamification data: {e}")
+            # Requeue so the next flush retries; points are re-read at that time
+            with self._lock:
+                self._dirty_users.update(user_id for user_id, _ in rows)
+                self._pending_achievements[:0] = achievements
@@ -0,0 +1,286 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Response, g, request
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = [(key, self._copy(value)) for key, value in self._values.items()]
+        for key, value in sorted(items):
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _copy(self, value):
+        return value
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _copy(self, value):
+        return [value[0][:], value[1], value[2]]
+
+    def _render_sample(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            cumulative += n
+            le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {total}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_latency = registry.register(Histogram(
+    'agritech_http_request_duration_seconds', 'HTTP request latency by route',
+    ('route', 'method', 'status')
+))
+requests_in_flight = registry.register(Gauge(
+    'agritech_http_requests_in_flight', 'HTTP requests currently being served'
+))
+span_latency = registry.register(Histogram(
+    'agritech_span_duration_seconds', 'Duration of named spans inside requests and background tasks',
+    ('span',), buckets=(0.0001, 0.0005) + DEFAULT_BUCKETS
+))
+profiles_dumped = registry.register(Counter(
+    'agritech_profiles_dumped_total', 'Slow-request stack profiles written to disk', ('route',)
+))
+
+
+@contextmanager
+def span(name):
+    """Time a block of work and record it under the given span name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        span_latency.observe(time.perf_counter() - start, span=name)
+
+
+class SamplingProfiler:
+    """Samples the stacks of in-flight request threads at a fixed interval.
+
+    Requests slower than the threshold have their samples written out in the
+    collapsed "frame;frame;frame count" format read by flamegraph.pl and
+    speedscope. The sampler thread only starts once a request is tracked.
+
+    Stacks come from sys._current_frames(), which only sees OS threads, so
+    this needs a threaded server. Under eventlet or gevent every request is
+    a greenlet on the same thread and nothing useful is sampled.
+    """
+
+    def __init__(self, output_dir='profiles', interval=0.005, slow_threshold=0.5):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+
+    def start_request(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self._active[ident] = StackCounter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+
+    def finish_request(self, route, duration):
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if not stacks or duration < self.slow_threshold:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_route = route.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'root'
+        path = os.path.join(
+            self.output_dir,
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_route}-{int(duration * 1000)}ms.folded"
+        )
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        profiles_dumped.inc(route=route)
+        return path
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stacks in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == own_ident:
+                        continue
+                    stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        parts.reverse()
+        return ';'.join(parts)
+
+
+def _green_threads_patched():
+    # Only asks libraries that are already imported; neither is a dependency
+    eventlet_patcher = sys.modules.get('eventlet.patcher')
+    if eventlet_patcher is not None and eventlet_patcher.is_monkey_patched('thread'):
+        return 'eventlet'
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        return 'gevent'
+    return None
+
+
+def init_app(app):
+    """Attach per-route latency tracking, the /metrics endpoint and optional profiling"""
+    profiler = None
+    if app.config.get('PROFILING_ENABLED', os.environ.get('AGRITECH_PROFILE') == '1'):
+        green = _green_threads_patched()
+        if green is not None:
+            print(f"Warning: profiling disabled, {green} has monkey-patched threading; "
+                  "run the threaded server to profile requests")
+        else:
+            profiler = SamplingProfiler(
+                output_dir=app.config.get('PROFILING_OUTPUT_DIR', 'profiles'),
+                interval=app.config.get('PROFILING_INTERVAL', 0.005),
+                slow_threshold=app.config.get('PROFILING_SLOW_THRESHOLD', 0.5)
+            )
+    app.extensions['profiler'] = profiler
+
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+        requests_in_flight.inc()
+        if profiler is not None:
+            profiler.start_request()
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        start = g.pop('_request_start', None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        requests_in_flight.dec()
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = g.pop('_response_status', 500 if exc is not None else 200)
+        request_latency.observe(duration, route=route, method=request.method, status=status)
+        if profiler is not None:
+            profiler.finish_request(route, duration)
+
+    @app.after_request
+    def _remember_status(response):
+        g._response_status = response.status_code
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    return app
@@ -0,0 +1,88 @@
+import math
+import threading
+from collections import OrderedDict
+
+from instrumentation import Counter, Gauge, registry
+
+cache_requests = registry.register(Counter(
+    'agritech_recommendation_cache_requests_total', 'Recommendation cache lookups', ('result',)
+))
+cache_evictions = registry.register(Counter(
+    'agritech_recommendation_cache_evictions_total', 'Entries evicted to stay within max_entries'
+))
+cache_entries = registry.register(Gauge(
+    'agritech_recommendation_cache_entries', 'Entries in the recommendation cache'
+))
+
+# Bucket width per input. Readings closer than this are treated as the same
+# field conditions: soil tests report NPK in ~5 kg/ha steps, pH to 0.1, and
+# rainfall totals are rarely meaningful below 25 mm.
+QUANTIZATION_STEPS = {
+    'year': 1,
+    'area': 0.5,
+    'N': 5,
+    'P': 5,
+    'K': 5,
+    'pH': 0.1,
+    'avg_temp_c': 0.5,
+    'total_rainfall_mm': 25,
+    'avg_humidity_percent': 2
+}
+
+
+class RecommendationCache:
+    """LRU cache of ranked crops and advice, keyed on quantized inputs.
+
+    Entries belong to one model version; the first lookup under a new
+    version drops everything cached for the old one.
+    """
+
+    def __init__(self, max_entries=4096, steps=None):
+        self.max_entries = max_entries
+        self.steps = steps or QUANTIZATION_STEPS
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    def key(self, data, features):
+        quantized = []
+        for f in features:
+            try:
+                value = float(data.get(f, 0))
+            except (TypeError, ValueError):
+                return None
+            # NaN/inf can't be bucketed; such requests skip the cache
+            if not math.isfinite(value):
+                return None
+            quantized.append(round(value / self.steps.get(f, 1)))
+        return tuple(quantized) + (str(data.get('season', '')), str(data.get('state', '')))
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+            cache_entries.set(0)
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        cache_requests.inc(result='hit' if value is not None else 'miss')
+        return value
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                cache_evictions.inc()
+            cache_entries.set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            cache_entries.set(0)
@@ -8,6 +8,7 @@ let sensorCharts = {};
 let currentUser = 'default_user';
 let weatherData = [];
 let cropImageFile = null;
+let sensorSchema = null;
 
 // Chart.js default configuration
 Chart.defaults.font.family = 'Inter, sans-serif';
@@ -941,6 +942,9 @@ function setupSocketListeners() {
     socket.on('connect', function() {
         console.log('✅ Connected to IoT monitoring system');
         showNotification('Connected to real-time monitoring', 'success');
+        // Ask for compact value arrays instead of full JSON readings
+        socket.emit('sensor_format', { format: 'columnar' });
+        loadSensorHistory();
     });
     
     socket.on('disconnect', function() {
@@ -948,11 +952,65 @@ function setupSocketListeners() {
         showNotification('Disconnected from real-time monitoring', 'warning');
     });
     
-    socket.on('sensor_update', function(data) {
-        updateSensorData(data);
-        updateMetricCards(data);
-        checkAlerts(data);
+    socket.on('sensor_schema', function(schema) {
+        sensorSchema = schema;
     });
+    
+    socket.on('sensor_update_compact', function(row) {
+        if (!sensorSchema) return;
+        handleSensorReading(decodeRow(row, sensorSchema.columns, sensorSchema.scales));
+    });
+    
+    socket.on('sensor_update', handleSensorReading);
+}
+
+function handleSensorReading(data) {
+    updateSensorData(data);
+    updateMetricCards(data);
+    checkAlerts(data);
+}
+
+async function loadSensorHistory() {
+    try {
+        const response = await fetch('/api/sensor-data?format=columnar&limit=20');
+        const result = await response.json();
+        const readings = decodeColumnar(result.recent_readings);
+        readings.forEach(updateSensorData);
+        if (readings.length) {
+            updateMetricCards(readings[readings.length - 1]);
+        }
+    } catch (error) {
+        console.error('Sensor history error:', error);
+    }
+}
+
+// Compact wire format: quantized ints per column, dotted names for nested fields
+function decodeRow(row, columns, scales) {
+    const record = {};
+    columns.forEach((column, i) => {
+        let value = row[i];
+        if (value !== null && scales[column]) {
+            value = value / scales[column];
+        }
+        const path = column.split('.');
+        let target = record;
+        path.slice(0, -1).forEach(key => {
+            target = target[key] = target[key] || {};
+        });
+        target[path[path.length - 1]] = value;
+    });
+    return record;
+}
+
+function decodeColumnar(payload) {
+    if (!payload || payload.format !== 'columnar') {
+        return payload || [];
+    }
+    const records = [];
+    for (let i = 0; i < payload.length; i++) {
+        records.push(decodeRow(payload.data.map(column => column[i]), payload.columns, payload.scales));
+    }
+    return records;
 }
 
 function updateSensorData(data) {
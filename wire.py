@@ -0,0 +1,142 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'text/html', 'text/css',
+    'text/plain', 'text/csv', 'image/svg+xml'
+}
+
+# Decimal places kept for each sensor reading in the compact format
+SENSOR_PRECISION = {
+    'soil_moisture': 1,
+    'soil_temperature': 1,
+    'soil_ph': 2,
+    'ambient_temperature': 1,
+    'humidity': 1,
+    'light_intensity': 0,
+    'wind_speed': 1,
+    'npk_levels.nitrogen': 1,
+    'npk_levels.phosphorus': 1,
+    'npk_levels.potassium': 1,
+    'uv_index': 1
+}
+SENSOR_COLUMNS = ['timestamp'] + list(SENSOR_PRECISION) + ['weather_condition']
+
+
+def _flatten(record, prefix=''):
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def _quantize(value, scale):
+    return None if value is None else int(round(value * scale))
+
+
+def schema(columns, precision):
+    """Column names plus the integer scale for each quantized column"""
+    return {
+        'columns': columns,
+        'scales': {c: 10 ** precision[c] for c in columns if c in precision}
+    }
+
+
+def encode_row(record, columns, precision):
+    """Encode one record as a flat value array matching schema(columns, precision)"""
+    flat = _flatten(record)
+    return [
+        _quantize(flat.get(c), 10 ** precision[c]) if c in precision else flat.get(c)
+        for c in columns
+    ]
+
+
+def to_columnar(records, precision, columns=None):
+    """Encode records as one array per column, with floats quantized to scaled ints.
+
+    Nested dicts are flattened to dotted column names; the client rebuilds them.
+    """
+    flat = [_flatten(r) for r in records]
+    if columns is None:
+        columns = list(flat[0]) if flat else []
+    data = []
+    for c in columns:
+        if c in precision:
+            scale = 10 ** precision[c]
+            data.append([_quantize(r.get(c), scale) for r in flat])
+        else:
+            data.append([r.get(c) for r in flat])
+    payload = schema(columns, precision)
+    payload.update({'format': 'columnar', 'length': len(flat), 'data': data})
+    return payload
+
+
+def wants_columnar():
+    return request.args.get('format') == 'columnar'
+
+
+def _accepted_encodings(header):
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = _accepted_encodings(header or '')
+    candidates = (['br'] if brotli is not None else []) + ['gzip', 'deflate']
+    best = max(candidates, key=lambda e: accepted.get(e, 0.0))
+    return best if accepted.get(best, 0.0) > 0 else None
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level)
+    return zlib.compress(data, level)
+
+
+def init_app(app):
+    """Compress responses above COMPRESS_MIN_SIZE using the client's preferred encoding"""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough
+                or not 200 <= response.status_code < 300
+                or response.status_code == 204
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress(data, encoding, app.config['COMPRESS_LEVEL']))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return app